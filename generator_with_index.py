@@ -2,13 +2,14 @@
 """
 generator_with_index.py
 
-Extension of the RONAVI generator that maintains an index file called "rgeres_index.json"
+Extension of the RONAVI generator that maintains an index file called "rgeres_index.jsonl"
 (you asked: "make sure rgeres index").
 
 Features:
  - Generates RONAVI Lua scripts (local templates or via AI if configured).
- - Writes/updates a local index file (rgeres_index.json) inside the output directory,
-   listing generated files, timestamps, source (local/ai), and optional GitHub blob SHA.
+ - Writes/updates a local index file (rgeres_index.jsonl, append-only JSON Lines) inside the
+   output directory, listing generated files, timestamps, source (local/ai), and optional
+   GitHub blob SHA.
  - Optionally pushes generated files and the index to a GitHub repository (via the
    Contents API) if --repo and --github-token are provided.
 
@@ -23,21 +24,33 @@ Usage examples:
 
 import os
 import argparse
-import textwrap
+import asyncio
+import atexit
+import hashlib
 import json
 import base64
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict
 
-try:
-    import requests
-except Exception:
-    requests = None
+# The HTTP and AI client libraries are imported lazily at their first call
+# site (_requests/_aiohttp/generate_ai_script): they drag in sizeable
+# dependency trees that the fast path (--mode local, no --repo) never needs,
+# and deferring them cuts CLI startup time accordingly.
 
+# orjson (Rust) is several times faster than stdlib json at (de)serializing
+# the index entries; fall back to stdlib when it is not installed.
 try:
-    import openai
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
 except Exception:
-    openai = None
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
 
 AI_SYSTEM_PROMPT = (
     "You are an assistant that only outputs valid Lua code for RONAVI (a fictional rename of "
@@ -46,154 +59,365 @@ AI_SYSTEM_PROMPT = (
     "Instance.new, Players, etc.)."
 )
 
+# Templates are stored flush-left so no dedent pass is needed at import time,
+# and as bytes so nothing on the save/push path re-encodes them.
 LOCAL_TEMPLATES = {
-    "server": textwrap.dedent("""\
-        -- ronavi_server.lua
-        -- Server script for RONAVI (place in ServerScriptService in RONAVI STUDIO)
-
-        local Players = game:GetService("Players")
-        local Workspace = game:GetService("Workspace")
-
-        if not Workspace:FindFirstChild("RONAVISpawn") then
-            local spawn = Instance.new("SpawnLocation")
-            spawn.Name = "RONAVISpawn"
-            spawn.Size = Vector3.new(12, 1, 12)
-            spawn.Position = Vector3.new(0, 5, 0)
-            spawn.Anchored = true
-            spawn.Transparency = 0.3
-            spawn.BrickColor = BrickColor.new("Bright purple")
-            spawn.TopSurface = Enum.SurfaceType.Smooth
-            spawn.Parent = Workspace
-        end
-
-        Players.PlayerAdded:Connect(function(player)
-            local leaderstats = Instance.new("Folder")
-            leaderstats.Name = "leaderstats"
-            leaderstats.Parent = player
-
-            local coins = Instance.new("IntValue")
-            coins.Name = "Coins"
-            coins.Value = 100
-            coins.Parent = leaderstats
-
-            print("RONAVI: Welcome " .. player.Name .. "! Starting coins: " .. tostring(coins.Value))
-        end)
-    """),
-    "local": textwrap.dedent("""\
-        -- ronavi_local.lua
-        -- LocalScript for RONAVI (place in StarterPlayerScripts in RONAVI STUDIO)
-
-        local Players = game:GetService("Players")
-        local player = Players.LocalPlayer
-        local playerGui = player:WaitForChild("PlayerGui")
-
-        local screenGui = Instance.new("ScreenGui")
-        screenGui.Name = "RonaviHUD"
-        screenGui.ResetOnSpawn = false
-
-        local title = Instance.new("TextLabel")
-        title.Name = "TitleLabel"
-        title.Size = UDim2.new(0, 300, 0, 50)
-        title.Position = UDim2.new(0, 10, 0, 10)
-        title.BackgroundTransparency = 0.4
-        title.TextScaled = true
-        title.Text = "Welcome to RONAVI!"
-        title.Parent = screenGui
-
-        local coinLabel = Instance.new("TextLabel")
-        coinLabel.Name = "CoinLabel"
-        coinLabel.Size = UDim2.new(0, 200, 0, 40)
-        coinLabel.Position = UDim2.new(0, 10, 0, 70)
-        coinLabel.BackgroundTransparency = 0.4
-        coinLabel.Text = "Coins: --"
-        coinLabel.Parent = screenGui
-
-        local earnButton = Instance.new("TextButton")
-        earnButton.Name = "EarnButton"
-        earnButton.Size = UDim2.new(0, 140, 0, 40)
-        earnButton.Position = UDim2.new(0, 220, 0, 70)
-        earnButton.Text = "Earn 10 Coins"
-        earnButton.Parent = screenGui
-
-        screenGui.Parent = playerGui
-
-        local function updateCoins()
-            local leader = player:FindFirstChild("leaderstats")
-            if leader and leader:FindFirstChild("Coins") then
-                coinLabel.Text = "Coins: " .. tostring(leader.Coins.Value)
-            else
-                coinLabel.Text = "Coins: 0"
-            end
-        end
-
-        player.ChildAdded:Connect(function(child)
-            if child.Name == "leaderstats" then
-                child:WaitForChild("Coins").Changed:Connect(updateCoins)
-                updateCoins()
-            end
-        end)
-
-        earnButton.MouseButton1Click:Connect(function()
-            local leader = player:FindFirstChild("leaderstats")
-            if leader and leader:FindFirstChild("Coins") then
-                leader.Coins.Value = leader.Coins.Value + 10
-            end
-        end)
-    """)
+    "server": b"""\
+-- ronavi_server.lua
+-- Server script for RONAVI (place in ServerScriptService in RONAVI STUDIO)
+
+local Players = game:GetService("Players")
+local Workspace = game:GetService("Workspace")
+
+if not Workspace:FindFirstChild("RONAVISpawn") then
+    local spawn = Instance.new("SpawnLocation")
+    spawn.Name = "RONAVISpawn"
+    spawn.Size = Vector3.new(12, 1, 12)
+    spawn.Position = Vector3.new(0, 5, 0)
+    spawn.Anchored = true
+    spawn.Transparency = 0.3
+    spawn.BrickColor = BrickColor.new("Bright purple")
+    spawn.TopSurface = Enum.SurfaceType.Smooth
+    spawn.Parent = Workspace
+end
+
+Players.PlayerAdded:Connect(function(player)
+    local leaderstats = Instance.new("Folder")
+    leaderstats.Name = "leaderstats"
+    leaderstats.Parent = player
+
+    local coins = Instance.new("IntValue")
+    coins.Name = "Coins"
+    coins.Value = 100
+    coins.Parent = leaderstats
+
+    print("RONAVI: Welcome " .. player.Name .. "! Starting coins: " .. tostring(coins.Value))
+end)
+""",
+    "local": b"""\
+-- ronavi_local.lua
+-- LocalScript for RONAVI (place in StarterPlayerScripts in RONAVI STUDIO)
+
+local Players = game:GetService("Players")
+local player = Players.LocalPlayer
+local playerGui = player:WaitForChild("PlayerGui")
+
+local screenGui = Instance.new("ScreenGui")
+screenGui.Name = "RonaviHUD"
+screenGui.ResetOnSpawn = false
+
+local title = Instance.new("TextLabel")
+title.Name = "TitleLabel"
+title.Size = UDim2.new(0, 300, 0, 50)
+title.Position = UDim2.new(0, 10, 0, 10)
+title.BackgroundTransparency = 0.4
+title.TextScaled = true
+title.Text = "Welcome to RONAVI!"
+title.Parent = screenGui
+
+local coinLabel = Instance.new("TextLabel")
+coinLabel.Name = "CoinLabel"
+coinLabel.Size = UDim2.new(0, 200, 0, 40)
+coinLabel.Position = UDim2.new(0, 10, 0, 70)
+coinLabel.BackgroundTransparency = 0.4
+coinLabel.Text = "Coins: --"
+coinLabel.Parent = screenGui
+
+local earnButton = Instance.new("TextButton")
+earnButton.Name = "EarnButton"
+earnButton.Size = UDim2.new(0, 140, 0, 40)
+earnButton.Position = UDim2.new(0, 220, 0, 70)
+earnButton.Text = "Earn 10 Coins"
+earnButton.Parent = screenGui
+
+screenGui.Parent = playerGui
+
+local function updateCoins()
+    local leader = player:FindFirstChild("leaderstats")
+    if leader and leader:FindFirstChild("Coins") then
+        coinLabel.Text = "Coins: " .. tostring(leader.Coins.Value)
+    else
+        coinLabel.Text = "Coins: 0"
+    end
+end
+
+player.ChildAdded:Connect(function(child)
+    if child.Name == "leaderstats" then
+        child:WaitForChild("Coins").Changed:Connect(updateCoins)
+        updateCoins()
+    end
+end)
+
+earnButton.MouseButton1Click:Connect(function()
+    local leader = player:FindFirstChild("leaderstats")
+    if leader and leader:FindFirstChild("Coins") then
+        leader.Coins.Value = leader.Coins.Value + 10
+    end
+end)
+""",
 }
 
 
-INDEX_FILENAME = "rgeres_index.json"
+# The templates are constants, so their base64 form for the GitHub APIs is
+# too; encoding once at import leaves zero base64 work on the local-mode
+# push path.
+_TEMPLATE_B64 = {k: base64.b64encode(v).decode("utf-8") for k, v in LOCAL_TEMPLATES.items()}
+
+
+INDEX_FILENAME = "rgeres_index.jsonl"
+
+# Lines starting with this byte are dead entries awaiting compaction.
+_TOMBSTONE = b"#"
+# Compact once tombstones make up more than this fraction of the file's lines.
+_COMPACT_THRESHOLD = 0.3
+
+# In-memory sidecars, keyed by index file path: (mtime_ns, live entry path ->
+# byte offset of its line) and the current tombstone count. The stored mtime
+# invalidates the cache if the file changed behind our back.
+_IDX_OFFSETS: Dict[str, tuple] = {}
+_IDX_TOMBSTONES: Dict[str, int] = {}
+
+# Long-lived descriptors for the JSONL indexes, keyed by index path, so a
+# flush costs only writes instead of an open/close pair each time. Opened
+# without O_APPEND because tombstones are positioned writes (Linux forces
+# O_APPEND pwrites to the end of the file).
+_IDX_FD: Dict[str, int] = {}
+
 
+def _index_fd(idx_path: str) -> int:
+    fd = _IDX_FD.get(idx_path)
+    if fd is None:
+        fd = os.open(idx_path, os.O_RDWR | os.O_CREAT, 0o644)
+        _IDX_FD[idx_path] = fd
+    return fd
 
-def save_file(contents: str, outdir: str, filename: str) -> str:
+
+def _close_index_fds():
+    for fd in _IDX_FD.values():
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _IDX_FD.clear()
+
+
+atexit.register(_close_index_fds)
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def save_file(contents: bytes, outdir: str, filename: str):
+    """
+    Write contents to outdir/filename atomically (tmp file + os.replace),
+    skipping the write entirely when the on-disk bytes already match.
+    Returns (path, changed).
+    """
     os.makedirs(outdir, exist_ok=True)
     path = os.path.join(outdir, filename)
-    with open(path, "w", encoding="utf-8") as f:
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if _digest(f.read()) == _digest(contents):
+                return path, False
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
         f.write(contents)
-    return path
+    os.replace(tmp_path, path)
+    return path, True
 
 
-def update_local_index(outdir: str, filename: str, source: str = "local", blob_sha: Optional[str] = None):
+def _index_mtime(idx_path: str) -> Optional[int]:
+    try:
+        return os.stat(idx_path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_offsets(idx_path: str) -> Dict[str, int]:
     """
-    Update or create the local rgeres_index.json file in outdir.
-    Each entry: name, path (relative), source, timestamp (UTC ISO), blob_sha (optional).
+    Build the path -> byte-offset map for a JSONL index, streaming it line by
+    line so memory stays O(1) in the file size. The parsed map is cached and
+    reused as long as the file's mtime_ns is unchanged, so repeated calls in
+    one run skip the re-scan entirely.
+    """
+    mtime = _index_mtime(idx_path)
+    cached = _IDX_OFFSETS.get(idx_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    offsets = {}
+    tombstones = 0
+    if mtime is not None:
+        with open(idx_path, "rb") as f:
+            pos = 0
+            for line in f:
+                if line.startswith(_TOMBSTONE):
+                    tombstones += 1
+                elif line.strip():
+                    try:
+                        offsets[_loads(line)["path"]] = pos
+                    except Exception:
+                        pass
+                pos += len(line)
+    _IDX_OFFSETS[idx_path] = (mtime, offsets)
+    _IDX_TOMBSTONES[idx_path] = tombstones
+    return offsets
+
+
+def read_index(outdir: str):
+    """
+    Yield live entries from the rgeres_index.jsonl file in outdir, streaming
+    line by line and skipping tombstoned lines.
     """
     idx_path = os.path.join(outdir, INDEX_FILENAME)
-    entries = []
+    if not os.path.exists(idx_path):
+        return
+    with open(idx_path, "rb") as f:
+        for line in f:
+            if line.strip() and not line.startswith(_TOMBSTONE):
+                try:
+                    yield _loads(line)
+                except Exception:
+                    continue
+
+
+def load_index_map(outdir: str) -> Dict[str, Dict]:
+    """
+    Return the live index entries as a dict keyed by path (last write wins),
+    so callers get O(1) per-path lookups instead of scanning an entry list.
+    """
+    return {e["path"]: e for e in read_index(outdir) if "path" in e}
+
 
-    if os.path.exists(idx_path):
+def compact_index(outdir: str) -> str:
+    """
+    Rewrite the JSONL index without its tombstoned lines and refresh the
+    in-memory offset sidecar.
+    """
+    idx_path = os.path.join(outdir, INDEX_FILENAME)
+    if not os.path.exists(idx_path):
+        return idx_path
+    tmp_path = idx_path + ".tmp"
+    offsets = {}
+    with open(idx_path, "rb") as src, open(tmp_path, "wb") as dst:
+        pos = 0
+        for line in src:
+            if line.strip() and not line.startswith(_TOMBSTONE):
+                try:
+                    entry_path = _loads(line)["path"]
+                except Exception:
+                    continue
+                offsets[entry_path] = pos
+                dst.write(line)
+                pos += len(line)
+    os.replace(tmp_path, idx_path)
+    # The held descriptor now points at the replaced inode; drop it so the
+    # next flush reopens the compacted file
+    fd = _IDX_FD.pop(idx_path, None)
+    if fd is not None:
         try:
-            with open(idx_path, "r", encoding="utf-8") as f:
-                entries = json.load(f)
-                if not isinstance(entries, list):
-                    entries = []
-        except Exception:
-            entries = []
+            os.close(fd)
+        except OSError:
+            pass
+    _IDX_OFFSETS[idx_path] = (_index_mtime(idx_path), offsets)
+    _IDX_TOMBSTONES[idx_path] = 0
+    return idx_path
 
-    rel_path = os.path.relpath(os.path.join(outdir, filename), start=outdir)
-    now = datetime.utcnow().isoformat() + "Z"
-
-    # Update existing entry with same name/path, else append
-    updated = False
-    for e in entries:
-        if e.get("path") == rel_path:
-            e.update({"name": filename, "source": source, "timestamp": now, "blob_sha": blob_sha})
-            updated = True
-            break
-
-    if not updated:
-        entries.append({
-            "name": filename,
-            "path": rel_path,
+
+def _run_timestamp() -> str:
+    """
+    UTC ISO timestamp with a Z suffix, formatted once per caller: all entries
+    of one run share the same run time.
+    """
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+class IndexBuffer:
+    """
+    Accumulates index entry upserts in memory and flushes them to the JSONL
+    index in one pass, so a batch of files pays one open/tombstone/append
+    cycle per flush instead of one per entry. All entries are stamped with
+    the buffer's single run timestamp.
+    """
+
+    def __init__(self, now: Optional[str] = None):
+        self._entries: Dict[str, Dict] = {}
+        self._now = now or _run_timestamp()
+
+    def upsert(self, name: str, path: str, source: str = "local", blob_sha: Optional[str] = None):
+        """
+        Record (or overwrite) the entry for path in memory; no I/O happens
+        until flush.
+        """
+        self._entries[path] = {
+            "name": name,
+            "path": path,
             "source": source,
-            "timestamp": now,
+            "timestamp": self._now,
             "blob_sha": blob_sha
-        })
+        }
+
+    def dumps(self, base: Optional[Dict[str, Dict]] = None) -> bytes:
+        """
+        Serialize the buffered entries as JSONL bytes without touching disk,
+        optionally overlaid onto base (a path -> entry map as returned by
+        load_index_map). Used by pushes that must not update the local index
+        before the commit lands, and by memory-only runs.
+        """
+        entries = dict(base) if base else {}
+        entries.update(self._entries)
+        return b"".join(_dumps(entry) + b"\n" for entry in entries.values())
+
+    def flush(self, outdir: str) -> Optional[str]:
+        """
+        Write all buffered entries to the index in outdir: stale lines are
+        tombstoned in place ('#' first byte), fresh lines appended, and the
+        buffer cleared. Returns the index path, or None if nothing to write.
+        compact_index runs automatically once tombstones pass
+        _COMPACT_THRESHOLD of the file's lines.
+        """
+        if not self._entries:
+            return None
+        os.makedirs(outdir, exist_ok=True)
+        idx_path = os.path.join(outdir, INDEX_FILENAME)
+        offsets = _load_offsets(idx_path)
+
+        fd = _index_fd(idx_path)
+        for path in self._entries:
+            old_offset = offsets.get(path)
+            if old_offset is not None:
+                os.pwrite(fd, _TOMBSTONE, old_offset)
+                _IDX_TOMBSTONES[idx_path] = _IDX_TOMBSTONES.get(idx_path, 0) + 1
+        end = os.lseek(fd, 0, os.SEEK_END)
+        for path, entry in self._entries.items():
+            line = _dumps(entry) + b"\n"
+            os.write(fd, line)
+            offsets[path] = end
+            end += len(line)
+        self._entries.clear()
+        # Re-validate the cache against the mtime of what we just wrote
+        _IDX_OFFSETS[idx_path] = (_index_mtime(idx_path), offsets)
+
+        tombstones = _IDX_TOMBSTONES.get(idx_path, 0)
+        if tombstones and tombstones > _COMPACT_THRESHOLD * (tombstones + len(offsets)):
+            compact_index(outdir)
+        return idx_path
+
+
+def update_local_index(outdir: str, filename: str, source: str = "local", blob_sha: Optional[str] = None,
+                       now: Optional[str] = None):
+    """
+    Update or create the local rgeres_index.jsonl file in outdir (append-only).
+    Each entry: name, path (relative), source, timestamp (UTC ISO), blob_sha (optional).
 
-    with open(idx_path, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2)
-    return idx_path
+    Single-entry convenience wrapper; callers updating several entries should
+    accumulate them in an IndexBuffer and flush once. now overrides the entry
+    timestamp (batched callers pass one shared run timestamp).
+    """
+    rel_path = os.path.relpath(os.path.join(outdir, filename), start=outdir)
+    buf = IndexBuffer(now)
+    buf.upsert(filename, rel_path, source=source, blob_sha=blob_sha)
+    return buf.flush(outdir)
 
 
 # GitHub helpers --------------------------------------------------------------
@@ -204,50 +428,459 @@ def _gh_headers(token: str):
     return {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
 
 
+_SESSION = None
+
+
+def _requests():
+    """
+    Lazily import the sync HTTP client, preferring niquests (drop-in requests
+    replacement with HTTP/2 multiplexing, so concurrent GET/PUT pairs share a
+    single connection) and falling back to plain requests.
+    """
+    try:
+        import niquests as mod
+    except ImportError:
+        try:
+            import requests as mod
+        except ImportError:
+            raise RuntimeError("requests package not installed. Install with: pip install requests")
+    return mod
+
+
+def _aiohttp():
+    """
+    Lazily import aiohttp; only the push path needs it.
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("aiohttp package not installed. Install with: pip install aiohttp")
+    return aiohttp
+
+
+def _session(token: str):
+    """
+    Return a module-level requests/niquests Session with the auth headers set
+    once, so TCP+TLS setup is amortized across all GitHub calls via keep-alive.
+    """
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = _requests().Session()
+        _SESSION.headers.update(_gh_headers(token))
+    return _SESSION
+
+
+def git_blob_sha1(data: bytes) -> str:
+    """
+    Compute the git blob SHA for data locally: sha1("blob <len>\\0" + data).
+    Matches the SHAs returned by the blob/contents APIs, so no round-trip is
+    needed just to learn what GitHub will call a given content.
+    """
+    h = hashlib.sha1()
+    h.update(f"blob {len(data)}\0".encode("utf-8"))
+    h.update(data)
+    return h.hexdigest()
+
+
+# On-disk cache of gh_get_file responses keyed by "repo/path@ref", holding
+# GitHub's ETag and the response body. Re-runs send If-None-Match; a 304
+# reuses the cached body, is much cheaper than a 200 and does not count
+# against the API rate limit.
+_GH_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ronavi")
+_GH_CACHE_FILE = os.path.join(_GH_CACHE_DIR, "gh_cache.json")
+_GH_CACHE = None
+
+
+def _gh_cache() -> Dict:
+    global _GH_CACHE
+    if _GH_CACHE is None:
+        try:
+            with open(_GH_CACHE_FILE, "rb") as f:
+                _GH_CACHE = _loads(f.read())
+        except Exception:
+            _GH_CACHE = {}
+    return _GH_CACHE
+
+
+def _gh_cache_store():
+    os.makedirs(_GH_CACHE_DIR, exist_ok=True)
+    tmp_path = _GH_CACHE_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_dumps(_GH_CACHE))
+    os.replace(tmp_path, _GH_CACHE_FILE)
+
+
 def gh_get_file(repo: str, path: str, ref: str, token: str) -> Optional[Dict]:
     """
     Return GitHub contents API response for file if exists, else None.
+    Responses are cached on disk with their ETag, so repeated lookups become
+    conditional requests answered from the cache on 304.
     """
-    if requests is None:
-        raise RuntimeError("requests package not installed. Install with: pip install requests")
     owner, name = repo.split("/", 1)
     url = f"{GITHUB_API}/repos/{owner}/{name}/contents/{path}"
-    resp = requests.get(url, params={"ref": ref}, headers=_gh_headers(token))
+    cache = _gh_cache()
+    key = f"{repo}/{path}@{ref}"
+    cached = cache.get(key)
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+    resp = _session(token).get(url, params={"ref": ref}, headers=headers)
+    if resp.status_code == 304 and cached is not None:
+        return cached.get("body")
     if resp.status_code == 200:
-        return resp.json()
+        body = resp.json()
+        etag = resp.headers.get("ETag")
+        if etag:
+            cache[key] = {"etag": etag, "body": body}
+            _gh_cache_store()
+        return body
     return None
 
 
-def gh_put_file(repo: str, path: str, content_bytes: bytes, branch: str, token: str, message: str, sha: Optional[str] = None):
+def gh_put_file(repo: str, path: str, content_bytes: bytes, branch: str, token: str, message: str, sha: Optional[str] = None,
+                content_b64: Optional[str] = None):
     """
-    Create or update a file via GitHub Contents API.
+    Create or update a file via GitHub Contents API. content_b64 may carry an
+    already-base64-encoded body (e.g. _TEMPLATE_B64), skipping the encode here.
+
+    sha may be an optimistic/cached value (e.g. the blob_sha recorded in the
+    local index): if GitHub rejects it as stale (409/422), the current SHA is
+    fetched once and the PUT retried, so the extra GET probe is only paid on
+    a mismatch instead of on every call.
     Returns the API JSON response.
     """
-    if requests is None:
-        raise RuntimeError("requests package not installed. Install with: pip install requests")
     owner, name = repo.split("/", 1)
     url = f"{GITHUB_API}/repos/{owner}/{name}/contents/{path}"
     payload = {
         "message": message,
-        "content": base64.b64encode(content_bytes).decode("utf-8"),
+        "content": content_b64 if content_b64 is not None else base64.b64encode(content_bytes).decode("utf-8"),
         "branch": branch
     }
     if sha:
         payload["sha"] = sha
-    resp = requests.put(url, headers=_gh_headers(token), json=payload)
+    resp = _session(token).put(url, data=_dumps(payload),
+                               headers={"Content-Type": "application/json"})
+    if resp.status_code in (409, 422) and sha is not None:
+        # Cached SHA was stale (or the file was deleted): resync and retry once
+        existing = gh_get_file(repo, path, branch, token)
+        current = existing["sha"] if existing else None
+        if current != sha:
+            payload["sha"] = current
+            if current is None:
+                del payload["sha"]
+            resp = _session(token).put(url, data=_dumps(payload),
+                                       headers={"Content-Type": "application/json"})
     if resp.status_code in (200, 201):
         return resp.json()
     else:
         raise RuntimeError(f"GitHub API error {resp.status_code}: {resp.text}")
 
 
-def generate_local_script(script_type: str) -> str:
+def gh_put_file_indexed(repo: str, path: str, content_bytes: bytes, branch: str, token: str,
+                        message: str, outdir: str):
+    """
+    Contents-API push that seeds the PUT with the blob_sha cached in the
+    local index, skipping the gh_get_file probe entirely on the common path.
+    """
+    entry = load_index_map(outdir).get(path)
+    sha = entry.get("blob_sha") if entry else None
+    return gh_put_file(repo, path, content_bytes, branch, token, message, sha)
+
+
+# Cap on in-flight GitHub requests, to stay within API rate limits.
+_GH_CONCURRENCY = 8
+
+
+async def _gh_request(session, method: str, url: str, expected, **kwargs):
+    """
+    Issue one GitHub API request on an open aiohttp session and return the
+    parsed JSON, raising on any status not in expected. A json= payload is
+    serialized with _dumps (orjson when available) rather than the stdlib
+    encoder aiohttp would use.
+    """
+    payload = kwargs.pop("json", None)
+    if payload is not None:
+        kwargs["data"] = _dumps(payload)
+        kwargs.setdefault("headers", {})["Content-Type"] = "application/json"
+    async with session.request(method, url, **kwargs) as resp:
+        if resp.status in expected:
+            return await resp.json()
+        text = await resp.text()
+        raise RuntimeError(f"GitHub API error {resp.status}: {text}")
+
+
+async def gh_get_file_async(session, repo: str, path: str, ref: str) -> Optional[Dict]:
+    """
+    Async variant of gh_get_file operating on an open aiohttp session.
+    """
+    owner, name = repo.split("/", 1)
+    url = f"{GITHUB_API}/repos/{owner}/{name}/contents/{path}"
+    async with session.get(url, params={"ref": ref}) as resp:
+        if resp.status == 200:
+            return await resp.json()
+        return None
+
+
+async def gh_put_file_async(session, repo: str, path: str, content_bytes: bytes, branch: str,
+                            message: str, sha: Optional[str] = None):
+    """
+    Async variant of gh_put_file operating on an open aiohttp session.
+    """
+    owner, name = repo.split("/", 1)
+    url = f"{GITHUB_API}/repos/{owner}/{name}/contents/{path}"
+    payload = {
+        "message": message,
+        "content": base64.b64encode(content_bytes).decode("utf-8"),
+        "branch": branch
+    }
+    if sha:
+        payload["sha"] = sha
+    return await _gh_request(session, "PUT", url, (200, 201), json=payload)
+
+
+async def gh_create_blob_async(session, repo: str, content_bytes: bytes,
+                               content_b64: Optional[str] = None) -> str:
+    """
+    Create a blob via the Git Data API and return its SHA. content_b64 may
+    carry an already-base64-encoded body, skipping the encode here.
+    """
+    owner, name = repo.split("/", 1)
+    url = f"{GITHUB_API}/repos/{owner}/{name}/git/blobs"
+    payload = {"content": content_b64 if content_b64 is not None else base64.b64encode(content_bytes).decode("utf-8"),
+               "encoding": "base64"}
+    created = await _gh_request(session, "POST", url, (201,), json=payload)
+    return created["sha"]
+
+
+async def gh_push_batch_async(session, repo: str, branch: str, files: Dict[str, object],
+                              message: str) -> str:
+    """
+    Push several files as a single commit via the Git Data API.
+
+    files maps repo path -> contents, where contents is either bytes (a blob
+    is created for it) or a str blob SHA obtained earlier from
+    gh_create_blob_async. Blobs are uploaded concurrently (capped by
+    _GH_CONCURRENCY); all files land atomically in one commit, so only one
+    set of round-trips (ref, tree, commit, ref update) is paid per batch
+    instead of per file. Returns the new commit SHA.
+    """
+    owner, name = repo.split("/", 1)
+    base = f"{GITHUB_API}/repos/{owner}/{name}"
+
+    sem = asyncio.Semaphore(_GH_CONCURRENCY)
+
+    async def _blob_sha(contents):
+        if isinstance(contents, str):
+            return contents
+        async with sem:
+            return await gh_create_blob_async(session, repo, contents)
+
+    ref = await _gh_request(session, "GET", f"{base}/git/ref/heads/{branch}", (200,))
+    base_commit = ref["object"]["sha"]
+    commit = await _gh_request(session, "GET", f"{base}/git/commits/{base_commit}", (200,))
+    base_tree = commit["tree"]["sha"]
+
+    shas = await asyncio.gather(*(_blob_sha(c) for c in files.values()))
+    tree_items = [{"path": path, "mode": "100644", "type": "blob", "sha": sha}
+                  for path, sha in zip(files, shas)]
+
+    tree = await _gh_request(session, "POST", f"{base}/git/trees", (201,),
+                             json={"base_tree": base_tree, "tree": tree_items})
+    new_commit = await _gh_request(session, "POST", f"{base}/git/commits", (201,),
+                                   json={"message": message, "tree": tree["sha"],
+                                         "parents": [base_commit]})
+    await _gh_request(session, "PATCH", f"{base}/git/refs/heads/{branch}", (200,),
+                      json={"sha": new_commit["sha"]})
+    return new_commit["sha"]
+
+
+def _run_with_session(token: str, coro_factory):
+    """
+    Run an async GitHub helper on a fresh aiohttp session (sync wrapper glue).
+    """
+    client = _aiohttp()
+
+    async def _runner():
+        async with client.ClientSession(headers=_gh_headers(token)) as session:
+            return await coro_factory(session)
+
+    return asyncio.run(_runner())
+
+
+def gh_create_blob(repo: str, content_bytes: bytes, token: str) -> str:
+    """
+    Sync wrapper around gh_create_blob_async.
+    """
+    return _run_with_session(token, lambda s: gh_create_blob_async(s, repo, content_bytes))
+
+
+def gh_push_batch(repo: str, branch: str, token: str, files: Dict[str, object], message: str) -> str:
+    """
+    Sync wrapper around gh_push_batch_async.
+    """
+    return _run_with_session(token, lambda s: gh_push_batch_async(s, repo, branch, files, message))
+
+
+def generate_local_script(script_type: str) -> bytes:
     if script_type not in LOCAL_TEMPLATES:
         raise ValueError("unknown type: " + script_type)
     return LOCAL_TEMPLATES[script_type]
 
 
-def main():
+# Default model for AI mode; noticeably lower latency than gpt-4 for short
+# Lua scripts.
+AI_MODEL = "gpt-4o-mini"
+
+
+def generate_ai_script(script_type: str, outdir: str, filename: str, to_disk: bool = True):
+    """
+    Generate a script via OpenAI with stream=True, writing each chunk to a
+    temp file as it arrives. Disk I/O overlaps generation and peak memory
+    stays at one chunk instead of the whole completion; the temp file is
+    swapped in atomically, or discarded when the output is unchanged.
+    With to_disk=False the chunks are only accumulated in memory.
+    Returns (path, full contents, changed).
+    """
+    try:
+        import openai
+    except ImportError:
+        raise RuntimeError("openai package not installed. Install with: pip install openai")
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set for AI mode.")
+    openai.api_key = api_key
+    prompt = f"Write a {script_type} Lua script for RONAVI STUDIO. Return only Lua code."
+    messages = [{"role": "system", "content": AI_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+    path = os.path.join(outdir, filename)
+    stream = openai.ChatCompletion.create(model=AI_MODEL, messages=messages,
+                                          temperature=0.2, max_tokens=1200, stream=True)
+    buf = []
+    if not to_disk:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.get("content", "")
+            if delta:
+                buf.append(delta)
+        return path, "".join(buf).encode("utf-8"), True
+    os.makedirs(outdir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.get("content", "")
+            if delta:
+                f.write(delta)
+                buf.append(delta)
+    # Encode once; the same bytes are reused for the digest, save and push
+    contents = "".join(buf).encode("utf-8")
+    changed = True
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            changed = _digest(f.read()) != _digest(contents)
+    if changed:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return path, contents, changed
+
+
+async def _generate_one(args, stype, fname, index_buffer):
+    """
+    Generate and save one script off-thread (file I/O and the AI call both
+    block), then record it in the index buffer back on the event loop.
+    Returns (fname, content bytes, precomputed base64 body or None) for the
+    push phase, or None if unchanged.
+    """
+    if args.mode == "local":
+        contents = generate_local_script(stype)
+        if args.no_local_save:
+            local_path, changed = fname, True
+        else:
+            local_path, changed = await asyncio.to_thread(save_file, contents, args.outdir, fname)
+    else:
+        # AI mode streams chunks straight to the output file (or stays
+        # in memory for --no-local-save)
+        local_path, contents, changed = await asyncio.to_thread(
+            generate_ai_script, stype, args.outdir, fname, not args.no_local_save)
+    if not changed:
+        # Identical content on disk: keep the existing index entry (and its
+        # blob_sha). The file still joins the push set when a push was
+        # requested — whether it already lives upstream is decided there
+        # against the recorded blob SHA, not against local disk state
+        print(f"Unchanged {local_path}")
+        if not (args.repo and args.github_token):
+            return None
+    else:
+        print(f"Generated {fname} (in memory)" if args.no_local_save else f"Saved {local_path}")
+        index_buffer.upsert(fname, fname, source=args.mode)
+    return fname, contents, _TEMPLATE_B64.get(stype) if args.mode == "local" else None
+
+
+async def _generate_all(args, to_create, index_buffer):
+    """
+    Run all per-file generation concurrently and return the (fname, bytes,
+    b64-or-None) triples for the files that changed, plus the unchanged ones
+    whenever a push was requested.
+    """
+    results = await asyncio.gather(
+        *(_generate_one(args, stype, fname, index_buffer) for stype, fname in to_create))
+    return [r for r in results if r is not None]
+
+
+async def _push_all(args, to_push, index_buffer, known):
+    """
+    Upload the collected files over one aiohttp session: blobs concurrently
+    via asyncio.gather, then the index and the single batched commit. known
+    is the path -> entry snapshot of the index as left by the previous run,
+    taken before this run's flush overwrites it.
+    Returns the new commit SHA, or None when every file's recorded blob SHA
+    already matches its content (the previous push landed) and there is
+    nothing to commit.
+    """
+    def _recorded_sha(fname):
+        entry = known.get(fname)
+        return entry.get("blob_sha") if entry else None
+
+    # Files whose recorded blob SHA matches their content were committed by a
+    # previous successful push and sit unchanged in the base tree: they need
+    # neither a blob upload nor a tree entry
+    needed = [(fname, data, b64) for fname, data, b64 in to_push
+              if _recorded_sha(fname) != git_blob_sha1(data)]
+    if not needed:
+        return None
+
+    async with _aiohttp().ClientSession(headers=_gh_headers(args.github_token)) as session:
+        sem = asyncio.Semaphore(_GH_CONCURRENCY)
+
+        async def _blob(data, b64):
+            async with sem:
+                return await gh_create_blob_async(session, args.repo, data, content_b64=b64)
+
+        shas = await asyncio.gather(*(_blob(data, b64) for _, data, b64 in needed))
+        files = {}
+        for (fname, _, _), blob_sha in zip(needed, shas):
+            files[fname] = blob_sha
+            # Record the blob SHA before serializing the index, so the index
+            # committed below already carries the final SHAs.
+            index_buffer.upsert(fname, fname, source=args.mode, blob_sha=blob_sha)
+        files[INDEX_FILENAME] = index_buffer.dumps(known)
+        commit_sha = await gh_push_batch_async(session, args.repo, args.branch, files,
+                                               args.commit_message)
+        # Only record the blob SHAs locally once the commit has landed: a
+        # failed push leaves the index without them, so the next run retries
+        # instead of concluding everything is already upstream
+        if not args.no_local_save:
+            index_buffer.flush(args.outdir)
+        return commit_sha
+
+
+# --type value -> (script type, filename) pairs, frozen once at import
+_TO_CREATE = {
+    "server": [("server", "ronavi_server.lua")],
+    "local": [("local", "ronavi_local.lua")],
+    "both": [("server", "ronavi_server.lua"), ("local", "ronavi_local.lua")],
+}
+
+_PARSER = None
+
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="RONAVI generator with rgeres index")
     parser.add_argument("--mode", choices=["local", "ai"], default="local")
     parser.add_argument("--type", choices=["server", "local", "both"], default="both")
@@ -256,64 +889,54 @@ def main():
     parser.add_argument("--branch", default="main", help="branch to push to when --repo provided")
     parser.add_argument("--github-token", help="GitHub token with repo access (optional)")
     parser.add_argument("--commit-message", default="Add RONAVI scripts", help="Commit message for GitHub updates")
-    args = parser.parse_args()
-
-    to_create = []
-    if args.type in ("server", "both"):
-        to_create.append(("server", "ronavi_server.lua"))
-    if args.type in ("local", "both"):
-        to_create.append(("local", "ronavi_local.lua"))
-
-    # Generate and save locally
-    for stype, fname in to_create:
-        if args.mode == "local":
-            contents = generate_local_script(stype)
-        else:
-            # Minimal AI support: sends prompt to OpenAI if configured
-            if openai is None:
-                raise RuntimeError("openai package not installed. Install with: pip install openai")
-            api_key = os.environ.get("OPENAI_API_KEY")
-            if not api_key:
-                raise RuntimeError("OPENAI_API_KEY not set for AI mode.")
-            openai.api_key = api_key
-            prompt = f"Write a {stype} Lua script for RONAVI STUDIO. Return only Lua code."
-            messages = [{"role": "system", "content": AI_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
-            resp = openai.ChatCompletion.create(model="gpt-4", messages=messages, temperature=0.2, max_tokens=1200)
-            contents = resp.choices[0].message.content
-
-        local_path = save_file(contents, args.outdir, fname)
-        print(f"Saved {local_path}")
-
-        # Update local index
-        idx_path = update_local_index(args.outdir, fname, source=args.mode, blob_sha=None)
-        print(f"Updated local index at {idx_path}")
-
-        # If repo push requested, attempt to push file and then update index blob_sha
-        if args.repo and args.github_token:
-            # push script file to repo path same as filename at repo root
-            try:
-                existing = gh_get_file(args.repo, fname, args.branch, args.github_token)
-                sha = existing["sha"] if existing else None
-                result = gh_put_file(args.repo, fname, contents.encode("utf-8"), args.branch, args.github_token, args.commit_message, sha)
-                blob_sha = result["content"]["sha"]
-                print(f"Pushed {fname} to {args.repo}@{args.branch} (sha: {blob_sha})")
-                # Update local index with blob sha
-                update_local_index(args.outdir, fname, source=args.mode, blob_sha=blob_sha)
-            except Exception as e:
-                print("Failed to push file to GitHub:", e)
-
-    # After all files, optionally push index file to repo too
-    local_index_path = os.path.join(args.outdir, INDEX_FILENAME)
-    if args.repo and args.github_token and os.path.exists(local_index_path):
-        with open(local_index_path, "rb") as f:
-            idx_bytes = f.read()
+    parser.add_argument("--no-local-save", action="store_true",
+                        help="keep generated files in memory and only push them (requires --repo and --github-token)")
+    return parser
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    # Built lazily (keeping import cheap) and memoized, so programmatic
+    # callers invoking main() repeatedly pay argparse setup only once
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _build_parser()
+    return _PARSER
+
+
+def main():
+    args = _get_parser().parse_args()
+    if args.no_local_save and not (args.repo and args.github_token):
+        _get_parser().error("--no-local-save requires --repo and --github-token")
+
+    to_create = _TO_CREATE[args.type]
+
+    # Generate and save concurrently; index updates are buffered in memory
+    # and flushed once, and changed contents are collected for one batched
+    # push at the end
+    index_buffer = IndexBuffer()
+    generated = asyncio.run(_generate_all(args, to_create, index_buffer))
+    to_push = generated if args.repo and args.github_token else []
+
+    # Snapshot the index before the flush below overwrites this run's entries
+    # (resetting their blob_sha), so the push phase can still compare against
+    # the blob SHAs recorded by the previous successful push
+    known = load_index_map(args.outdir) if to_push and not args.no_local_save else {}
+
+    if not args.no_local_save:
+        idx_path = index_buffer.flush(args.outdir)
+        if idx_path:
+            print(f"Updated local index at {idx_path}")
+
+    # Push everything (scripts + index) as a single commit via the Git Data API
+    if args.repo and args.github_token and to_push:
         try:
-            existing_idx = gh_get_file(args.repo, INDEX_FILENAME, args.branch, args.github_token)
-            idx_sha = existing_idx["sha"] if existing_idx else None
-            res = gh_put_file(args.repo, INDEX_FILENAME, idx_bytes, args.branch, args.github_token, args.commit_message + " (update rgeres index)", idx_sha)
-            print(f"Pushed index {INDEX_FILENAME} to {args.repo}@{args.branch} (sha: {res['content']['sha']})")
+            commit_sha = asyncio.run(_push_all(args, to_push, index_buffer, known))
+            if commit_sha is None:
+                print(f"Everything already up to date on {args.repo}@{args.branch}")
+            else:
+                print(f"Pushed to {args.repo}@{args.branch} in commit {commit_sha}")
         except Exception as e:
-            print("Failed to push index to GitHub:", e)
+            print("Failed to push to GitHub:", e)
 
     print("Done.")
 